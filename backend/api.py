@@ -3,27 +3,29 @@
 import os
 import logging
 import asyncio
-import json
+import orjson
 import signal
-from datetime import datetime, timedelta
+import hashlib
+import hmac
+import time
+from collections import OrderedDict
+from datetime import timedelta
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-# MOCK IMPORTS FOR EASY PORTABLE RUNNING
-# import torch
-# from transformers import BertTokenizer
-from passlib.context import CryptContext
-import jwt
+import bcrypt
+from jwt import api_jws
 # Import our DB setup, models, and helper for saving moderator actions
 from backend.database import SessionLocal, engine, Base
 from backend.models import User, ModeratorAction
-# from backend.model import CyberbullyModel
 from backend.moderator_db import save_moderator_action
+from backend.queue_store import MemoryQueueStore, RedisQueueStore
 
 # ─── 1) Logging setup ──────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -51,29 +53,53 @@ app.add_middleware(
 )
 
 # ─── 4) Database initialization ────────────────────────────────────────────────
-# Create tables if they don’t already exist
-Base.metadata.create_all(bind=engine)
+@app.on_event("startup")
+async def create_tables():
+    """
+    Create tables if they don’t already exist, plus any index missing
+    from an existing table (create_all skips tables that already exist).
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_indexes)
+
+def create_missing_indexes(sync_conn):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
 
-def get_db():
+async def get_db():
     """
-    FastAPI dependency: yields a SQLAlchemy session and ensures it’s closed.
+    FastAPI dependency: yields an async SQLAlchemy session and ensures it’s closed.
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # ─── 5) Authentication utilities & Pydantic schemas ───────────────────────────
-class MockPwdContext:
-    def hash(self, password: str) -> str:
-        import hashlib
-        return hashlib.sha256(password.encode()).hexdigest()
-    def verify(self, password: str, hashed: str) -> bool:
-        import hashlib
-        return hashlib.sha256(password.encode()).hexdigest() == hashed
-
-pwd_context = MockPwdContext()
+# bcrypt is CPU-bound (~250ms at 12 rounds); hashing/verifying runs in a
+# worker thread so it never blocks the event loop. bcrypt is called
+# directly: passlib 1.7's backend probe breaks on bcrypt >= 4.1
+BCRYPT_ROUNDS    = int(os.getenv("BCRYPT_ROUNDS", "10"))
+BCRYPT_MAX_BYTES = 72  # bcrypt ignores (newer releases reject) longer input
+
+def hash_password(password: str) -> str:
+    """
+    Return the bcrypt hash of `password`.
+    """
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+
+def verify_password(password: str, hashed: str) -> bool:
+    """
+    Check `password` against a stored hash. Accounts created before bcrypt
+    hold an unsalted sha256 hex digest; malformed hashes never match.
+    """
+    if not hashed.startswith("$2"):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, hashed)
+    try:
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+    except ValueError:
+        return False
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 class AuthRequest(BaseModel):
@@ -86,43 +112,70 @@ class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
 
+# Signed tokens for the current second, keyed by their serialized claims
+_token_cache: dict[bytes, str] = {}
+_token_cache_ts = 0
+
 def create_access_token(
     data: dict,
     expires_delta: timedelta = timedelta(hours=1)
 ) -> str:
     """
     Create a signed JWT with an expiration.
+    Claims are serialized with orjson and signed as raw JWS bytes; identical
+    claims within the same second (burst logins) reuse the cached token.
     """
-    to_encode = data.copy()
-    to_encode.update({"exp": datetime.utcnow() + expires_delta})
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    global _token_cache_ts
+    now = int(time.time())
+    if now != _token_cache_ts:
+        _token_cache.clear()
+        _token_cache_ts = now
+
+    claims = orjson.dumps(
+        {**data, "exp": now + int(expires_delta.total_seconds())},
+        option=orjson.OPT_SORT_KEYS
+    )
+    token = _token_cache.get(claims)
+    if token is None:
+        token = api_jws.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        _token_cache[claims] = token
+    return token
 
 # ─── 6) Authentication endpoints ──────────────────────────────────────────────
 @app.post("/auth/register", tags=["Auth"])
-def register(req: AuthRequest, db: Session = Depends(get_db)):
+async def register(req: AuthRequest, db: AsyncSession = Depends(get_db)):
     """
     Register a new moderator user.
     Hashes the password and stores email+hash.
     """
-    hashed_pw = pwd_context.hash(req.password)
+    if len(req.password.encode()) > BCRYPT_MAX_BYTES:
+        raise HTTPException(400, f"Password must be at most {BCRYPT_MAX_BYTES} bytes")
+    hashed_pw = await asyncio.to_thread(hash_password, req.password)
     user = User(email=req.email, hashed=hashed_pw)
     db.add(user)
     try:
-        db.commit()
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         # Raised if email already exists
         raise HTTPException(400, "Email already registered")
     return {"msg": "User registered"}
 
 @app.post("/auth/login", response_model=TokenResponse, tags=["Auth"])
-def login(req: AuthRequest, db: Session = Depends(get_db)):
+async def login(req: AuthRequest, db: AsyncSession = Depends(get_db)):
     """
     Verify credentials and return a JWT on success.
+    Legacy sha256 hashes are upgraded to bcrypt on a successful login.
     """
-    user = db.query(User).filter_by(email=req.email).first()
-    if not user or not pwd_context.verify(req.password, user.hashed):
+    result = await db.execute(select(User).where(User.email == req.email))
+    user   = result.scalars().first()
+    if not user or not await asyncio.to_thread(
+        verify_password, req.password, user.hashed
+    ):
         raise HTTPException(401, "Invalid credentials")
+    if not user.hashed.startswith("$2") and len(req.password.encode()) <= BCRYPT_MAX_BYTES:
+        user.hashed = await asyncio.to_thread(hash_password, req.password)
+        await db.commit()
     token = create_access_token({"sub": str(user.id)})
     return {"access_token": token}
 
@@ -142,8 +195,11 @@ class ActionRequest(BaseModel):
     comment_id: str
     action: str
 
-# MOCK MODEL SETUP (Zero dependency run)
-pending_queue: dict[str, dict] = {
+# Flagged comments awaiting moderation. Set REDIS_URL to share the queue
+# across uvicorn workers; otherwise it lives in process memory
+# (seeded with demo entries for the zero dependency run)
+REDIS_URL = os.getenv("REDIS_URL")
+DEMO_QUEUE = {
     "t1_cb101": {
         "text": "You are literally the most stupid person I have ever met on this platform, please delete your account.",
         "confidence": 0.985
@@ -157,9 +213,229 @@ pending_queue: dict[str, dict] = {
         "confidence": 0.897
     }
 }
+if REDIS_URL:
+    pending_queue = RedisQueueStore(REDIS_URL)
+else:
+    pending_queue = MemoryQueueStore(DEMO_QUEUE)
+
+# Micro-batching: /detect requests are collected for up to BATCH_MAX_WAIT_MS
+# (or BATCH_MAX_SIZE requests) and classified in a single forward pass
+BATCH_MAX_SIZE    = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+pending: asyncio.Queue = None  # (text, Future) pairs, created on startup
+
+# Classifier backend: "mock" (zero dependency run), "torch" (BERT + BiLSTM)
+# or "onnx" (exported graph served by ONNX Runtime)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "mock")
+# File the classifier is loaded from (None for the mock backend). Every
+# worker polls its mtime and reloads when a retrain or re-export in any
+# process replaces it; 0 disables the polling
+MODEL_PATH = {
+    "torch": os.getenv("MODEL_CHECKPOINT", "backend/best_model.safetensors"),
+    "onnx":  os.getenv("ONNX_MODEL_PATH", "backend/model.int8.onnx")
+}.get(MODEL_BACKEND)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+
+class MockClassifier:
+    """
+    Keyword-based stand-in exposing the same interface as BertClassifier.
+    """
+    toxic_words = ["stupid", "idiot", "hate", "dumb", "jerk", "kill", "garbage", "trash", "ugly", "shut up"]
+
+    def predict_batch(self, texts: list[str]) -> list[tuple[str, float]]:
+        results = []
+        for text in texts:
+            text_lower = text.lower()
+            is_toxic   = any(word in text_lower for word in self.toxic_words)
+            results.append(("cyberbully", 0.925) if is_toxic else ("non-cyberbully", 0.991))
+        return results
+
+def load_classifier():
+    """
+    Build the classifier selected by MODEL_BACKEND
+    (called at import and again whenever MODEL_PATH changes).
+    """
+    if MODEL_BACKEND == "torch":
+        from backend.inference import BertClassifier
+        return BertClassifier(
+            checkpoint=MODEL_PATH,
+            precision=os.getenv("MODEL_PRECISION", "int8"),
+            compile_model=os.getenv("MODEL_COMPILE", "0") == "1",
+            warmup_batch_size=BATCH_MAX_SIZE
+        )
+    if MODEL_BACKEND == "onnx":
+        from backend.onnx_inference import OnnxClassifier
+        return OnnxClassifier(MODEL_PATH)
+    return MockClassifier()
+
+def model_mtime():
+    """
+    Modification time of MODEL_PATH (None for the mock backend).
+    """
+    return os.stat(MODEL_PATH).st_mtime_ns if MODEL_PATH else None
+
+# Taken before loading, so a file replaced mid-load is picked up next poll
+classifier_mtime = model_mtime()
+classifier       = load_classifier()
+classifier_lock  = asyncio.Lock()  # one reload at a time per worker
+logger.info(f"Using {type(classifier).__name__} for /detect")
+
+# LRU cache of sha1(text) → (label, confidence): retries and spam floods
+# skip the forward pass entirely
+DETECT_CACHE_SIZE = int(os.getenv("DETECT_CACHE_SIZE", "50000"))
+detect_cache: OrderedDict[bytes, tuple[str, float]] = OrderedDict()
+# Bumped whenever the classifier is swapped; results computed under an
+# older generation are not cached
+detect_cache_generation = 0
+
 _current_proc = None  # for retraining subprocess
 
+# /retrain/stream coalesces SSE frames: flush after this many events or
+# once the oldest buffered event is this many seconds old
+SSE_FLUSH_MAX_EVENTS = 16
+SSE_FLUSH_INTERVAL   = 0.05
+
 # ─── 8) Detection endpoints ────────────────────────────────────────────────────
+async def batch_worker():
+    """
+    Background task: drain `pending` into batches and resolve each
+    request's future with its (label, confidence) result.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        batch    = [await pending.get()]
+        deadline = loop.time() + BATCH_MAX_WAIT_MS / 1000
+        while len(batch) < BATCH_MAX_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(pending.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        texts   = [text for text, _ in batch]
+        futures = [fut for _, fut in batch]
+        try:
+            # Run the blocking forward pass off the event loop
+            results = await asyncio.to_thread(classifier.predict_batch, texts)
+        except Exception as exc:
+            logger.exception("Error in batch inference")
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(exc)
+            continue
+        for fut, result in zip(futures, results):
+            # Caller may have disconnected (future cancelled)
+            if not fut.done():
+                fut.set_result(result)
+
+async def classify(text: str) -> tuple[str, float]:
+    """
+    Return (label, confidence) for `text`, serving repeated texts from
+    detect_cache and sending misses through the batching worker.
+    """
+    key = hashlib.sha1(text.encode()).digest()
+    if key in detect_cache:
+        detect_cache.move_to_end(key)
+        return detect_cache[key]
+
+    generation = detect_cache_generation
+    fut = asyncio.get_running_loop().create_future()
+    await pending.put((text, fut))
+    result = await fut
+
+    # The model may have been swapped while this request was in flight
+    if generation == detect_cache_generation:
+        detect_cache[key] = result
+        if len(detect_cache) > DETECT_CACHE_SIZE:
+            detect_cache.popitem(last=False)
+    return result
+
+async def rescore_queue():
+    """
+    Re-score every queued comment with the current classifier and store
+    the new cyberbully confidences. Texts go through the batching worker
+    so predict_batch never runs concurrently with /detect traffic.
+    """
+    items       = await pending_queue.items()
+    comment_ids = [cid for cid, _ in items]
+
+    loop    = asyncio.get_running_loop()
+    futures = []
+    for _, data in items:
+        fut = loop.create_future()
+        await pending.put((data["text"], fut))
+        futures.append(fut)
+    results = await asyncio.gather(*futures)
+
+    # Queue shows P(cyberbully), even if the new model no longer flags it
+    confidences = [
+        conf if label == "cyberbully" else 1 - conf
+        for label, conf in results
+    ]
+    await pending_queue.update_confidences(comment_ids, confidences)
+    return len(comment_ids)
+
+async def refresh_classifier():
+    """
+    Reload the classifier if MODEL_PATH changed since it was loaded, drop
+    stale cached results and re-score the moderation queue with it.
+    Returns the number of re-scored comments, or None if nothing changed.
+    """
+    global classifier, classifier_mtime, detect_cache_generation
+    async with classifier_lock:
+        mtime = await asyncio.to_thread(model_mtime)
+        if mtime == classifier_mtime:
+            return None
+        classifier       = await asyncio.to_thread(load_classifier)
+        classifier_mtime = mtime
+        detect_cache_generation += 1
+        detect_cache.clear()
+        logger.info(f"Reloaded {type(classifier).__name__} from {MODEL_PATH}")
+        return await rescore_queue()
+
+async def watch_model():
+    """
+    Background task: pick up a model file replaced by another process
+    (retrain streamed through another worker, ONNX re-export).
+    """
+    while True:
+        await asyncio.sleep(MODEL_RELOAD_INTERVAL)
+        try:
+            rescored = await refresh_classifier()
+            if rescored is not None:
+                logger.info(f"Re-scored {rescored} queued comments")
+        except Exception:
+            logger.exception("Error reloading the classifier")
+
+@app.on_event("startup")
+async def start_batcher():
+    """
+    Create the request queue and start the batching worker.
+    """
+    global pending
+    pending = asyncio.Queue()
+    app.state.batcher = asyncio.create_task(batch_worker())
+
+@app.on_event("startup")
+async def start_model_watcher():
+    """
+    Start polling MODEL_PATH for a replaced model file.
+    """
+    app.state.model_watcher = None
+    if MODEL_PATH and MODEL_RELOAD_INTERVAL > 0:
+        app.state.model_watcher = asyncio.create_task(watch_model())
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    """
+    Stop the batching worker and the model watcher.
+    """
+    app.state.batcher.cancel()
+    if app.state.model_watcher:
+        app.state.model_watcher.cancel()
+
 @app.options("/detect")
 def detect_preflight():
     """
@@ -168,25 +444,17 @@ def detect_preflight():
     return Response(status_code=200)
 
 @app.post("/detect", response_model=DetectResponse, tags=["Detection"])
-def detect(req: DetectRequest):
+async def detect(req: DetectRequest):
     """
     Classify incoming text as cyberbully/non-cyberbully.
     If flagged, enqueue in pending_queue.
     """
     try:
-        text_lower = req.text.lower()
-        toxic_words = ["stupid", "idiot", "hate", "dumb", "jerk", "kill", "garbage", "trash", "ugly", "shut up"]
-        is_toxic = any(word in text_lower for word in toxic_words)
-        
-        label = "cyberbully" if is_toxic else "non-cyberbully"
-        confidence = 0.925 if is_toxic else 0.991
-        
+        label, confidence = await classify(req.text)
+
         # Enqueue if flagged
         if label == "cyberbully":
-            pending_queue[req.comment_id] = {
-                "text": req.text,
-                "confidence": confidence
-            }
+            await pending_queue.add(req.comment_id, req.text, confidence)
         return DetectResponse(
             **req.dict(),
             label=label,
@@ -198,7 +466,7 @@ def detect(req: DetectRequest):
 
 # ─── 9) Queue & Moderation endpoints ──────────────────────────────────────────
 @app.get("/queue", response_model=list[DetectResponse], tags=["Moderation"])
-def get_queue():
+async def get_queue():
     """
     Return the current list of flagged comments.
     (Does NOT clear the queue so UI can re-fetch)
@@ -210,31 +478,30 @@ def get_queue():
             label="cyberbully",
             confidence=data["confidence"]
         )
-        for cid, data in pending_queue.items()
+        for cid, data in await pending_queue.items()
     ]
 
 @app.delete("/queue/{comment_id}", tags=["Moderation"])
-def delete_from_queue(comment_id: str):
+async def delete_from_queue(comment_id: str):
     """
     Remove a flagged comment (e.g. if moderator chose to ignore it).
     """
-    if comment_id in pending_queue:
-        del pending_queue[comment_id]
+    if await pending_queue.pop(comment_id) is not None:
         return {"message": f"{comment_id} removed from queue."}
     raise HTTPException(404, "Comment not found in queue")
 
 @app.post("/action", tags=["Moderation"])
-async def handle_action(request: Request, db: Session = Depends(get_db)):
+async def handle_action(request: Request, db: AsyncSession = Depends(get_db)):
     """
     Approve or reject a flagged comment permanently.
     Persists the decision in moderator_actions table.
     """
     data    = ActionRequest(**(await request.json()))
-    comment = pending_queue.pop(data.comment_id, None)
+    comment = await pending_queue.pop(data.comment_id)
     if not comment:
         raise HTTPException(404, "Comment not found")
     # Save to DB
-    save_moderator_action(
+    await save_moderator_action(
         comment_id=data.comment_id,
         text=comment["text"],
         action=data.action,
@@ -244,23 +511,35 @@ async def handle_action(request: Request, db: Session = Depends(get_db)):
     return {"message": "Action recorded"}
 
 @app.get("/history", tags=["Moderation"])
-def get_history(db: Session = Depends(get_db)):
+async def get_history(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
     """
-    Return full history of all moderator actions,
+    Stream one page of moderator actions as newline-delimited JSON,
     ordered by most recent first.
     """
-    rows = db.query(ModeratorAction).order_by(
-        ModeratorAction.timestamp.desc()
-    ).all()
-    return [
-        {
-            "comment_id": r.comment_id,
-            "text":       r.text,
-            "action":     r.action,
-            "timestamp":  r.timestamp.isoformat()
-        }
-        for r in rows
-    ]
+    stmt = (
+        select(ModeratorAction)
+        .order_by(ModeratorAction.timestamp.desc())
+        .limit(limit)
+        .offset(offset)
+        .execution_options(yield_per=500)
+    )
+
+    async def gen():
+        # Own session: a get_db session would be closed before the body streams
+        async with SessionLocal() as db:
+            rows = await db.stream_scalars(stmt)
+            async for r in rows:
+                yield orjson.dumps({
+                    "comment_id": r.comment_id,
+                    "text":       r.text,
+                    "action":     r.action,
+                    "timestamp":  r.timestamp.isoformat()
+                }) + b"\n"
+
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
 
 # ─── 10) Retraining endpoints ─────────────────────────────────────────────────
 @app.post("/retrain", tags=["Retraining"])
@@ -286,24 +565,58 @@ async def retrain_stream():
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.STDOUT
         )
-        # Read lines and yield as SSE
+        # Read lines and yield as SSE, batching frames into one write
+        loop     = asyncio.get_running_loop()
+        buf      = []
+        flush_at = 0.0
         while True:
-            line = await _current_proc.stdout.readline()
+            # Block indefinitely while nothing is buffered
+            timeout = max(flush_at - loop.time(), 0) if buf else None
+            try:
+                line = await asyncio.wait_for(_current_proc.stdout.readline(), timeout)
+            except asyncio.TimeoutError:
+                yield b"".join(buf)
+                buf.clear()
+                continue
             if not line:
                 break
-            text = line.decode().strip()
             try:
-                payload = json.loads(text)
-            except json.JSONDecodeError:
-                payload = {"type": "raw", "line": text}
+                payload = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                payload = {"type": "raw", "line": line.decode().strip()}
             # Log progress messages to console
             if payload.get("type") == "progress":
                 logger.info(f"[RETRAIN PROGRESS] {payload.get('progress')}%")
-            yield f"data: {json.dumps(payload)}\n\n"
+            if not buf:
+                flush_at = loop.time() + SSE_FLUSH_INTERVAL
+            buf.append(b"data: " + orjson.dumps(payload) + b"\n\n")
+            if len(buf) >= SSE_FLUSH_MAX_EVENTS:
+                yield b"".join(buf)
+                buf.clear()
+        if buf:
+            yield b"".join(buf)
         # Wait for process to exit
         await _current_proc.wait()
         logger.info("Retraining process completed")
-        yield "data: {\"type\":\"complete\"}\n\n"
+        if _current_proc.returncode == 0 and MODEL_BACKEND == "onnx":
+            # retrain_model.py only writes the PyTorch checkpoints
+            logger.warning(
+                "ONNX backend still serves the previous model: re-export with "
+                "`python -m backend.export_onnx`, workers reload it on their next poll"
+            )
+        elif _current_proc.returncode == 0:
+            # Swap in the retrained model here right away; other workers
+            # pick it up on their next poll of MODEL_PATH
+            try:
+                rescored = await refresh_classifier()
+                if rescored is not None:
+                    logger.info(f"Re-scored {rescored} queued comments")
+            except Exception as exc:
+                # A failed load keeps the previous model (the watcher retries
+                # on its next poll); the client still gets its complete frame
+                logger.exception("Error loading the retrained model")
+                yield b"data: " + orjson.dumps({"type": "error", "message": str(exc)}) + b"\n\n"
+        yield b"data: {\"type\":\"complete\"}\n\n"
 
     return StreamingResponse(
         gen(),
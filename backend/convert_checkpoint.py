@@ -0,0 +1,18 @@
+# convert_checkpoint.py
+# One-off script: converts a torch.save() checkpoint to safetensors so the
+# API can memory-map it at startup instead of unpickling every tensor
+
+import torch
+from safetensors.torch import save_file
+
+def convert_checkpoint(
+    src: str = "backend/best_model.pt",
+    dst: str = "backend/best_model.safetensors"
+):
+    print(f"🔄 Loading {src}...")
+    state_dict = torch.load(src, map_location="cpu", weights_only=True)
+    save_file({k: v.contiguous() for k, v in state_dict.items()}, dst)
+    print(f"✅ Saved {len(state_dict)} tensors to {dst}")
+
+if __name__ == "__main__":
+    convert_checkpoint()
@@ -1,21 +1,66 @@
 # backend/database.py
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
+import logging
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base
 
 
-# Database URL
+# Database URL (from .env; falls back to a local SQLite file)
 
-DATABASE_URL = "sqlite:///./cyberbully.db"
+load_dotenv()
+DATABASE_URL = make_url(os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./cyberbully.db"))
+
+# The engine is async: older .env files still name the sync drivers
+# (postgresql://, sqlite://), so swap in their asyncio counterparts
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres":   "postgresql+asyncpg",
+    "sqlite":     "sqlite+aiosqlite"
+}
+backend, _, driver = DATABASE_URL.drivername.partition("+")
+if driver not in ("asyncpg", "aiosqlite"):
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(
+            f"Unsupported DATABASE_URL backend {backend!r}: use postgresql+asyncpg:// "
+            "or sqlite+aiosqlite://"
+        )
+    DATABASE_URL = DATABASE_URL.set(drivername=ASYNC_DRIVERS[backend])
 
 
 # Engine & Session factory
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, echo=True)
-SessionLocal = sessionmaker(
-    autocommit=False,
+# SQL echo stringifies every statement + params on the request path;
+# opt in with SQL_ECHO=1 for debugging only
+SQL_ECHO = os.getenv("SQL_ECHO") == "1"
+if not SQL_ECHO:
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+# Pool sized for concurrent requests; pre-ping + recycle drop dead
+# connections before a request gets hold of them. SQLite file databases
+# get NullPool on older SQLAlchemy releases, which rejects sizing args
+POOL_OPTIONS = {}
+if DATABASE_URL.get_backend_name() != "sqlite":
+    POOL_OPTIONS = {
+        "pool_size":    int(os.getenv("DB_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    }
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=SQL_ECHO,
+    pool_pre_ping=True,
+    **POOL_OPTIONS
+)
+
+SessionLocal = async_sessionmaker(
+    bind=engine,
     autoflush=False,
-    bind=engine
+    expire_on_commit=False
 )
 
 # Base class for all ORM models
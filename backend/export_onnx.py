@@ -0,0 +1,60 @@
+# export_onnx.py
+# One-off script: exports the trained CyberbullyModel to ONNX and writes an
+# INT8-quantized copy for serving with MODEL_BACKEND=onnx
+
+import os
+import torch
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+from backend.model import CyberbullyModel, load_checkpoint
+
+CHECKPOINT = "backend/best_model.safetensors"
+ONNX_PATH  = "backend/model.onnx"
+INT8_PATH  = "backend/model.int8.onnx"
+
+def export_model(model: CyberbullyModel, onnx_path: str):
+    """
+    Trace model(input_ids, attention_mask) to ONNX with dynamic
+    batch and sequence axes.
+    """
+    # Dummy inputs only fix the rank/dtype; batch and sequence stay dynamic
+    input_ids      = torch.ones(1, 16, dtype=torch.long)
+    attention_mask = torch.ones(1, 16, dtype=torch.long)
+
+    torch.onnx.export(
+        model,
+        (input_ids, attention_mask),
+        onnx_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids":      {0: "b", 1: "s"},
+            "attention_mask": {0: "b", 1: "s"},
+            "logits":         {0: "b"}
+        },
+        opset_version=17
+    )
+
+def export_onnx(
+    checkpoint: str = CHECKPOINT,
+    onnx_path:  str = ONNX_PATH,
+    int8_path:  str = INT8_PATH
+):
+    print("🔄 Loading checkpoint...")
+    model = CyberbullyModel(pretrained=False)
+    model.load_state_dict(load_checkpoint(checkpoint), assign=True)
+    model.eval()
+
+    print("📦 Exporting to ONNX...")
+    export_model(model, onnx_path)
+    print(f"✅ FP32 model saved to {onnx_path}")
+
+    print("🔧 Quantizing weights to INT8...")
+    # Renamed into place: API workers reload int8_path as soon as it changes
+    tmp_path = int8_path + ".tmp"
+    quantize_dynamic(onnx_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, int8_path)
+    print(f"✅ INT8 model saved to {int8_path}")
+
+if __name__ == "__main__":
+    export_onnx()
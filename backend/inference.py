@@ -0,0 +1,132 @@
+# backend/inference.py
+# Real BERT + BiLSTM inference backend used by the API when MODEL_BACKEND=torch
+
+import os
+import torch
+import torch.nn as nn
+from transformers import BertTokenizerFast
+
+from backend.model import CyberbullyModel, load_checkpoint
+
+# Class index → API label (index 1 == "approved" in the retraining data)
+LABELS = ("non-cyberbully", "cyberbully")
+
+# Sequence-length buckets: most comments are short, so they run at width
+# 32/64 instead of sharing a batch (and its padding) with long ones
+LENGTH_BUCKETS = (32, 64, 128)
+
+# Intra-op threads do the GEMM work; inter-op parallelism only adds
+# contention for a single sequential forward pass. Set once per process:
+# torch refuses to change the inter-op pool a second time, which would
+# break rebuilding the classifier after a retrain
+torch.set_num_threads(os.cpu_count())
+torch.set_num_interop_threads(1)
+
+class BertClassifier:
+    """
+    Wraps the trained CyberbullyModel + tokenizer behind the
+    predict_batch() interface used by the /detect batcher.
+    """
+    def __init__(
+        self,
+        checkpoint: str = "backend/best_model.safetensors",
+        bert_model: str = "bert-base-uncased",
+        max_length: int = 128,
+        precision: str = "int8",
+        compile_model: bool = False,
+        warmup_batch_size: int = 16
+    ):
+        self.max_length = max_length
+        self.buckets    = tuple(b for b in LENGTH_BUCKETS if b < max_length) + (max_length,)
+        self.compiled   = compile_model
+        self.tokenizer  = BertTokenizerFast.from_pretrained(bert_model)
+        # Architecture only: skip downloading/allocating the pre-trained
+        # weights, the checkpoint replaces every parameter anyway. With
+        # assign=True the parameters stay memory-mapped, so preloaded
+        # workers share them through the page cache (fp32/bf16 only:
+        # int8 repacks every Linear/LSTM into new private buffers)
+        self.model = CyberbullyModel(bert_model, pretrained=False)
+        self.model.load_state_dict(load_checkpoint(checkpoint), assign=True)
+        self.model.eval()
+
+        if precision not in ("int8", "bf16", "fp32"):
+            raise ValueError(f"Unsupported precision: {precision}")
+
+        if precision == "int8":
+            # Dynamic INT8: weights of every nn.Linear (BERT projections +
+            # classifier head) and the BiLSTM are stored as qint8 and run
+            # through FBGEMM kernels; activations stay FP32
+            self.model = torch.quantization.quantize_dynamic(
+                self.model, {nn.Linear, nn.LSTM}, dtype=torch.qint8
+            )
+            self.model.eval()
+
+        # BF16 autocast halves weight bandwidth on AMX/AVX512-BF16 cores
+        self.autocast_dtype = torch.bfloat16 if precision == "bf16" else None
+
+        if compile_model:
+            # One graph per bucket width (static); the batch dimension is
+            # marked dynamic in _forward so any batch size reuses it
+            self.model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False)
+            # Pay compilation cost now rather than on the first user request;
+            # a second batch size flushes out any guard-driven recompile
+            for width in self.buckets:
+                for batch_size in (2, max(warmup_batch_size, 3)):
+                    ids  = torch.full((batch_size, width), self.tokenizer.pad_token_id)
+                    mask = torch.ones(batch_size, width, dtype=torch.long)
+                    with torch.inference_mode():
+                        self._forward(ids, mask)
+
+    def _forward(self, ids, mask):
+        if self.compiled:
+            for t in (ids, mask):
+                torch._dynamo.mark_dynamic(t, 0)
+                torch._dynamo.mark_static(t, 1)
+        with torch.autocast(
+            "cpu",
+            dtype=torch.bfloat16,
+            enabled=self.autocast_dtype is not None
+        ):
+            return self.model(ids, mask)
+
+    def predict_batch(self, texts: list[str]) -> list[tuple[str, float]]:
+        """
+        Tokenize and classify a batch of comments, one forward pass per
+        length bucket, returning a (label, confidence) pair per text, in order.
+        """
+        # One Rust tokenizer call for the whole batch; padding is per bucket
+        enc = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+
+        buckets: dict[int, list[int]] = {}
+        for i, ids in enumerate(enc["input_ids"]):
+            width = next(b for b in self.buckets if len(ids) <= b)
+            buckets.setdefault(width, []).append(i)
+
+        results = [None] * len(texts)
+        for width, idxs in buckets.items():
+            rows = [
+                {"input_ids": enc["input_ids"][i], "attention_mask": enc["attention_mask"][i]}
+                for i in idxs
+            ]
+            # A size-1 dim gets specialized and cannot stay dynamic, so a
+            # lone compiled request is duplicated (extra output ignored)
+            if self.compiled and len(rows) == 1:
+                rows = rows * 2
+
+            # Compiled graphs need the fixed bucket width; eager mode only
+            # pads to the longest sequence in the bucket
+            batch = self.tokenizer.pad(
+                rows,
+                padding="max_length" if self.compiled else "longest",
+                max_length=width,
+                return_tensors="pt"
+            )
+
+            with torch.inference_mode():
+                logits = self._forward(batch["input_ids"], batch["attention_mask"])
+                probs  = torch.softmax(logits.float(), dim=1)
+                conf, idx = probs.max(dim=1)
+
+            for i, label_idx, c in zip(idxs, idx.tolist(), conf.tolist()):
+                results[i] = (LABELS[label_idx], c)
+        return results
@@ -1,9 +1,11 @@
 # define the RNN based classifier to get best model
 # backend/model.py
 
+from typing import Union
 import torch
 import torch.nn as nn
-from transformers import BertModel
+from safetensors.torch import load_file
+from transformers import BertConfig, BertModel
 
 class CyberbullyModel(nn.Module):
     """
@@ -11,14 +13,21 @@ class CyberbullyModel(nn.Module):
     """
     def __init__(
         self,
-        bert_model: str = "bert-base-uncased",
+        bert_model: Union[str, BertConfig] = "bert-base-uncased",
         hidden_size: int = 128,
         num_layers: int = 1,
-        dropout: float = 0.2
+        dropout: float = 0.2,
+        pretrained: bool = True
     ):
         super().__init__()
-        # 1) Pre-trained BERT backbone
-        self.bert = BertModel.from_pretrained(bert_model)
+        # 1) BERT backbone: pre-trained weights for training; architecture
+        #    only (from the config) when a checkpoint supplies the weights
+        if isinstance(bert_model, BertConfig):
+            self.bert = BertModel(bert_model)
+        elif pretrained:
+            self.bert = BertModel.from_pretrained(bert_model)
+        else:
+            self.bert = BertModel(BertConfig.from_pretrained(bert_model))
         emb_size = self.bert.config.hidden_size
 
         # 2) Bidirectional LSTM on top of token embeddings
@@ -40,17 +49,60 @@ class CyberbullyModel(nn.Module):
         outputs = self.bert(input_ids=input_ids, attention_mask=attention_mask)
         seq_out = outputs.last_hidden_state  # (batch, seq_len, emb_size)
 
-        # B) BiLSTM over the sequence
-        lstm_out, _ = self.lstm(seq_out)     # (batch, seq_len, hidden*2)
-
-        # C) Pool: concatenate final forward & backward hidden states
-        final_feat = torch.cat(
-            (lstm_out[:, -1, :self.lstm.hidden_size],
-             lstm_out[:,  0, self.lstm.hidden_size:]),
-            dim=1
-        )
+        # B/C) BiLSTM + pool the final forward & backward states over the
+        #      real tokens only, so the result does not depend on how much
+        #      padding the batch (or the training loader) added
+        if self.lstm.num_layers == 1:
+            final_feat = self._pool_unpadded(seq_out, attention_mask)
+        else:
+            # Upper layers mix both directions, so only packing is exact
+            # here (not ONNX-exportable)
+            lengths = attention_mask.sum(dim=1).clamp(min=1).cpu()
+            packed  = nn.utils.rnn.pack_padded_sequence(
+                seq_out, lengths, batch_first=True, enforce_sorted=False
+            )
+            _, (h_n, _) = self.lstm(packed)  # h_n: (2*num_layers, batch, hidden)
+            final_feat  = torch.cat((h_n[-2], h_n[-1]), dim=1)
 
         # D) Classifier
         x = self.dropout(final_feat)
         logits = self.classifier(x)  # (batch, 2)
         return logits
+
+    def _pool_unpadded(self, seq_out, attention_mask):
+        """
+        Padding-independent pooling for a single-layer BiLSTM, built from
+        gathers so the graph stays ONNX-exportable (unlike packing).
+        Matches pack_padded_sequence + h_n, at the cost of a second LSTM run.
+        """
+        hidden  = self.lstm.hidden_size
+        seq_len = seq_out.size(1)
+        lengths = attention_mask.sum(dim=1).clamp(min=1)  # (batch,)
+
+        # Forward direction: right-padded input, so the state at the last
+        # real token has not seen any PAD position yet
+        fwd_out, _ = self.lstm(seq_out)
+        last_idx = (lengths - 1).view(-1, 1, 1).expand(-1, 1, hidden)
+        fwd_feat = fwd_out[:, :, :hidden].gather(1, last_idx).squeeze(1)
+
+        # Backward direction: rotate each row right by its padding so the
+        # PAD positions come first (left padding); the backward state at the
+        # first real token then has not seen any PAD position either
+        positions = torch.arange(seq_len, device=seq_out.device)
+        rotate    = (positions.unsqueeze(0) + lengths.unsqueeze(1)) % seq_len
+        left_pad  = seq_out.gather(1, rotate.unsqueeze(2).expand(-1, -1, seq_out.size(2)))
+        bwd_out, _ = self.lstm(left_pad)
+        first_idx = (seq_len - lengths).view(-1, 1, 1).expand(-1, 1, hidden)
+        bwd_feat  = bwd_out[:, :, hidden:].gather(1, first_idx).squeeze(1)
+
+        return torch.cat((fwd_feat, bwd_feat), dim=1)
+
+def load_checkpoint(path: str) -> dict:
+    """
+    Load a CyberbullyModel state dict memory-mapped (safetensors, or a
+    torch.save() file), so tensors are backed by the page cache rather
+    than fresh allocations. Pair with load_state_dict(..., assign=True).
+    """
+    if path.endswith(".safetensors"):
+        return load_file(path, device="cpu")
+    return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
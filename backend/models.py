@@ -1,7 +1,7 @@
 # define SQL tables for database table
 # backend/models.py
 
-from sqlalchemy import Column, Integer, String, DateTime, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import enum
@@ -42,3 +42,8 @@ class ModeratorAction(Base):
     action     = Column(String, nullable=False)  # "approved" or "rejected"
     timestamp  = Column(DateTime, default=datetime.utcnow)
 
+# /history sorts by timestamp DESC; prepare_training_data's
+# DISTINCT ON (comment_id) ... ORDER BY comment_id, timestamp DESC
+# needs the composite index to avoid a full-table sort
+Index("ix_modact_ts", ModeratorAction.timestamp.desc())
+Index("ix_modact_cid_ts", ModeratorAction.comment_id, ModeratorAction.timestamp.desc())
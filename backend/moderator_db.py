@@ -1,14 +1,14 @@
 # backend/moderator_db.py
 
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.models import ModeratorAction as ModeratorActionModel
 
-def save_moderator_action(
+async def save_moderator_action(
     comment_id: str,
     text: str,
     action: str,
-    db: Session
+    db: AsyncSession
 ):
     """
     Persist a moderator's approve/reject action into the database.
@@ -20,8 +20,8 @@ def save_moderator_action(
         timestamp=datetime.utcnow()
     )
     db.add(db_action)
-    db.commit()
-    db.refresh(db_action)
+    await db.commit()
+    await db.refresh(db_action)
     return db_action
 
 
@@ -0,0 +1,63 @@
+# backend/onnx_inference.py
+# ONNX Runtime inference backend used by the API when MODEL_BACKEND=onnx
+# (see export_onnx.py for producing the model file)
+
+import os
+import numpy as np
+import onnxruntime as ort
+from transformers import BertTokenizerFast
+
+# Same class order as backend.inference.LABELS
+LABELS = ("non-cyberbully", "cyberbully")
+
+class OnnxClassifier:
+    """
+    Serves the exported CyberbullyModel graph through ONNX Runtime behind
+    the predict_batch() interface used by the /detect batcher.
+    """
+    def __init__(
+        self,
+        model_path: str = "backend/model.int8.onnx",
+        bert_model: str = "bert-base-uncased",
+        max_length: int = 128
+    ):
+        self.max_length = max_length
+        self.tokenizer  = BertTokenizerFast.from_pretrained(bert_model)
+
+        sess_options = ort.SessionOptions()
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        sess_options.intra_op_num_threads     = os.cpu_count()
+
+        # Prefer CUDA when the GPU build of onnxruntime is installed
+        providers = ["CPUExecutionProvider"]
+        if "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        self.session = ort.InferenceSession(model_path, sess_options, providers=providers)
+
+    def predict_batch(self, texts: list[str]) -> list[tuple[str, float]]:
+        """
+        Tokenize and classify a batch of comments in one session run,
+        returning a (label, confidence) pair per text, in order.
+        """
+        enc = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        ids  = enc["input_ids"].astype(np.int64)
+        mask = enc["attention_mask"].astype(np.int64)
+
+        logits, = self.session.run(None, {"input_ids": ids, "attention_mask": mask})
+
+        # Numerically stable softmax over the two classes
+        exp   = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs = exp / exp.sum(axis=1, keepdims=True)
+        idx   = probs.argmax(axis=1)
+        conf  = probs[np.arange(len(idx)), idx]
+
+        return [
+            (LABELS[i], float(c))
+            for i, c in zip(idx.tolist(), conf.tolist())
+        ]
@@ -2,16 +2,19 @@
 # Extracts moderator actions from your PostgreSQL db and merges them
 # with an existing CSV to produce `merged_train.csv` for retraining
 
+import os
 import psycopg2
 import pandas as pd
+from dotenv import load_dotenv
 
-# PostgreSQL credentials
+# PostgreSQL credentials (from .env, see .env.example)
+load_dotenv()
 DB_CONFIG = {
-    "dbname":   "cyberbullydb",
-    "user":     "sepehrchn",
-    "password": "25051378Sc@",
-    "host":     "localhost",
-    "port":     "5432"
+    "dbname":   os.getenv("DB_NAME", "cyberbullydb"),
+    "user":     os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host":     os.getenv("DB_HOST", "localhost"),
+    "port":     os.getenv("DB_PORT", "5432")
 }
 
 def prepare_training_data(
@@ -21,31 +24,28 @@ def prepare_training_data(
     print("🔄 Connecting to the database...")
     conn = psycopg2.connect(**DB_CONFIG)
 
-    # Fetch latest moderator feedback per comment_id
+    # Fetch latest moderator feedback per comment_id, already labelled
+    # 'approved' → 1, 'rejected' → 0 by the database
     query = """
-        SELECT DISTINCT ON (comment_id) comment_id, text, action
+        SELECT DISTINCT ON (comment_id)
+               text AS clean_text,
+               CASE WHEN action = 'approved' THEN 1 ELSE 0 END AS "Label"
         FROM moderator_actions
         WHERE action IN ('approved', 'rejected')
         ORDER BY comment_id, timestamp DESC;
     """
-    df_feedback = pd.read_sql(query, conn)
+    df_feedback = pd.read_sql(query, conn, dtype_backend="pyarrow")
     conn.close()
 
     if df_feedback.empty:
         print("⚠️ No moderator feedback found.")
         return
 
-    # Map 'approved' → 1, 'rejected' → 0
-    label_map = {"approved": 1, "rejected": 0}
-    df_feedback["Label"]      = df_feedback["action"].map(label_map)
-    df_feedback = df_feedback.rename(columns={"text": "clean_text"})
-    df_feedback = df_feedback[["clean_text", "Label"]].dropna().drop_duplicates()
-
     print(f"✅ Extracted {len(df_feedback)} feedback samples.")
 
     # Load original dataset
     print("📂 Loading original dataset...")
-    df_original = pd.read_csv(original_csv)
+    df_original = pd.read_csv(original_csv, engine="pyarrow", dtype_backend="pyarrow")
     print(f"✅ Loaded {len(df_original)} original samples.")
 
     # Merge & dedupe
@@ -0,0 +1,87 @@
+# backend/queue_store.py
+# Storage for flagged comments awaiting moderation (the "pending queue")
+
+import time
+from typing import Optional
+
+class MemoryQueueStore:
+    """
+    In-process queue: fine for a single uvicorn worker, but each worker
+    holds its own copy, so entries are lost across `--workers N`.
+    """
+    def __init__(self, initial: Optional[dict] = None):
+        self._items: dict[str, dict] = dict(initial or {})
+
+    async def add(self, comment_id: str, text: str, confidence: float):
+        self._items[comment_id] = {"text": text, "confidence": confidence}
+
+    async def items(self) -> list[tuple[str, dict]]:
+        return list(self._items.items())
+
+    async def pop(self, comment_id: str) -> Optional[dict]:
+        return self._items.pop(comment_id, None)
+
+    async def update_confidences(self, comment_ids: list[str], confidences: list[float]):
+        for cid, confidence in zip(comment_ids, confidences):
+            # Skip entries moderated while re-scoring was running
+            if cid in self._items:
+                self._items[cid]["confidence"] = confidence
+
+class RedisQueueStore:
+    """
+    Redis-backed queue shared by all workers: one hash per comment
+    (`q:{comment_id}` → text, confidence) plus a sorted set `q:index`
+    scored by first-seen time to keep queue order.
+    """
+    index_key = "q:index"
+
+    def __init__(self, url: str):
+        import redis.asyncio as aioredis
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        # Atomic "update only if still queued": skips entries moderated
+        # while re-scoring was running instead of recreating their hash
+        self._set_if_exists = self.redis.register_script(
+            "if redis.call('EXISTS', KEYS[1]) == 1 then "
+            "return redis.call('HSET', KEYS[1], 'confidence', ARGV[1]) end "
+            "return 0"
+        )
+
+    @staticmethod
+    def _key(comment_id: str) -> str:
+        return f"q:{comment_id}"
+
+    async def add(self, comment_id: str, text: str, confidence: float):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(comment_id), mapping={"text": text, "confidence": confidence})
+            # nx: re-flagging a queued comment keeps its original position
+            pipe.zadd(self.index_key, {comment_id: time.time()}, nx=True)
+            await pipe.execute()
+
+    async def items(self) -> list[tuple[str, dict]]:
+        comment_ids = await self.redis.zrange(self.index_key, 0, -1)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for cid in comment_ids:
+                pipe.hgetall(self._key(cid))
+            rows = await pipe.execute()
+        return [
+            (cid, {"text": row["text"], "confidence": float(row["confidence"])})
+            for cid, row in zip(comment_ids, rows)
+            if row
+        ]
+
+    async def pop(self, comment_id: str) -> Optional[dict]:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(self._key(comment_id))
+            pipe.delete(self._key(comment_id))
+            pipe.zrem(self.index_key, comment_id)
+            row, _, _ = await pipe.execute()
+        if not row:
+            return None
+        return {"text": row["text"], "confidence": float(row["confidence"])}
+
+    async def update_confidences(self, comment_ids: list[str], confidences: list[float]):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for cid, confidence in zip(comment_ids, confidences):
+                # With a pipeline client this only queues EVALSHA
+                await self._set_if_exists(keys=[self._key(cid)], args=[confidence], client=pipe)
+            await pipe.execute()
@@ -2,20 +2,26 @@
 
 # Script to retrain your CyberbullyModel in‐process,
 
+import os
 import json
+import time
 import torch
 import torch.nn as nn
 from torch.utils.data import DataLoader
-from torch.cuda.amp import autocast, GradScaler
+from safetensors.torch import save_file
 from sklearn.metrics import precision_recall_fscore_support, confusion_matrix
 
 from dataset import CyberbullyDataset
 from backend.model import CyberbullyModel
 
 # Hyperparameters
-EPOCHS     = 3
-BATCH_SIZE = 8
-LR         = 2e-5 # Learning Rate =less LR=> more accuracy and lower speed
+EPOCHS      = 3
+BATCH_SIZE  = 32 # fits thanks to gradient checkpointing in BERT
+ACCUM_STEPS = 1  # effective batch = BATCH_SIZE * ACCUM_STEPS
+LR          = 2e-5 # Learning Rate =less LR=> more accuracy and lower speed
+
+# Minimum seconds between progress events (coalesces bursts of fast steps)
+PROGRESS_INTERVAL = 0.1
 
 def get_device():
     if torch.backends.mps.is_available():
@@ -26,18 +32,28 @@ def get_device():
 
 def evaluate(model, loader, device):
     model.eval()
-    all_preds, all_labels = [], []
+    # Preallocated CPU buffers: one tensor copy per batch instead of
+    # building Python int lists element by element
+    n_samples  = len(loader.dataset)
+    all_preds  = torch.empty(n_samples, dtype=torch.long)
+    all_labels = torch.empty_like(all_preds)
+    idx = 0
     with torch.no_grad():
         for batch in loader:
             input_ids      = batch["input_ids"].to(device)
             attention_mask = batch["attention_mask"].to(device)
-            labels         = batch["labels"].to(device)
+            labels         = batch["labels"]
 
             outputs = model(input_ids, attention_mask=attention_mask)
             preds   = torch.argmax(outputs, dim=1)
 
-            all_preds.extend(preds.cpu().tolist())
-            all_labels.extend(labels.cpu().tolist())
+            n = labels.size(0)
+            all_preds[idx:idx+n]  = preds.cpu()
+            all_labels[idx:idx+n] = labels
+            idx += n
+
+    all_preds  = all_preds[:idx].numpy()
+    all_labels = all_labels[:idx].numpy()
 
     # Compute F1 and confusion matrix
     _, _, f1, _ = precision_recall_fscore_support(
@@ -62,6 +78,7 @@ def retrain_main():
         "type":        "summary",
         "epochs":      EPOCHS,
         "batch_size":  BATCH_SIZE,
+        "accum_steps": ACCUM_STEPS,
         "total_steps": total_steps,
         "device":      str(device)
     }), flush=True)
@@ -70,36 +87,46 @@ def retrain_main():
     print(json.dumps({"type":"training_started"}), flush=True)
 
     model     = CyberbullyModel().to(device)
+    # Recompute BERT activations in backward: ~40% less activation memory
+    # in exchange for one extra forward, which pays for the larger batch
+    model.bert.gradient_checkpointing_enable()
     optimizer = torch.optim.AdamW(model.parameters(), lr=LR)
     criterion = nn.CrossEntropyLoss()
-    scaler    = GradScaler()
+    use_amp   = device.type == "cuda"
+    scaler    = torch.amp.GradScaler("cuda", enabled=use_amp)
 
     step = 0
     best_f1 = 0.0
     last_prog = -1
+    last_emit = 0.0
 
     for epoch in range(1, EPOCHS+1):
         model.train()
         running_loss = 0.0
 
-        for batch in train_loader:
-            optimizer.zero_grad()
+        optimizer.zero_grad()
+        for batch_idx, batch in enumerate(train_loader, start=1):
             input_ids      = batch["input_ids"].to(device)
             attention_mask = batch["attention_mask"].to(device)
             labels         = batch["labels"].to(device)
 
-            with autocast():
+            with torch.amp.autocast("cuda", dtype=torch.float16, enabled=use_amp):
                 outputs = model(input_ids, attention_mask=attention_mask)
                 loss    = criterion(outputs, labels)
 
-            scaler.scale(loss).backward()
-            scaler.step(optimizer)
-            scaler.update()
+            scaler.scale(loss / ACCUM_STEPS).backward()
+            if batch_idx % ACCUM_STEPS == 0 or batch_idx == len(train_loader):
+                scaler.step(optimizer)
+                scaler.update()
+                optimizer.zero_grad()
 
             running_loss += loss.item()
             step += 1
             prog = int(step/total_steps*100)
-            if prog > last_prog:
+            now  = time.monotonic()
+            if prog > last_prog and (
+                now - last_emit >= PROGRESS_INTERVAL or step == total_steps
+            ):
                 print(json.dumps({
                     "type":     "progress",
                     "epoch":    epoch,
@@ -107,6 +134,7 @@ def retrain_main():
                     "progress": prog
                 }), flush=True)
                 last_prog = prog
+                last_emit = now
 
         # End of epoch: eval and maybe save
         avg_loss = running_loss / len(train_loader)
@@ -122,6 +150,13 @@ def retrain_main():
         if f1_score > best_f1:
             best_f1 = f1_score
             torch.save(model.state_dict(), "backend/best_model.pt")
+            # Memory-mappable copy loaded by the API. Written aside and
+            # renamed so API workers polling it never read a partial file
+            save_file(
+                {k: v.detach().cpu().contiguous() for k, v in model.state_dict().items()},
+                "backend/best_model.safetensors.tmp"
+            )
+            os.replace("backend/best_model.safetensors.tmp", "backend/best_model.safetensors")
             print(json.dumps({"type":"model_saved","f1":round(f1_score,4)}), flush=True)
 
     # Done
@@ -128,6 +128,11 @@ function FlaggedComments() {
           setBestF1(msg.f1)
           break
 
+        case 'error':
+          // the API could not load or apply the retrained model
+          console.error('[Retrain SSE]', msg.message)
+          break
+
         case 'complete':
           // final “complete” event
           setProgress(100)
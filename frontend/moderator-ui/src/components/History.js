@@ -4,14 +4,27 @@
 import React, { useState, useEffect } from 'react';
 import '../styles/Dashboard.css';
 
+const PAGE_SIZE = 100;
+
 export default function History() {
   const [history, setHistory] = useState([]);
+  const [hasMore, setHasMore] = useState(false);
 
-  useEffect(() => {
-    fetch('http://localhost:8000/history')
-      .then(r => r.json())
-      .then(setHistory)
+  // Fetch one page of history starting at `offset` and append it
+  function loadPage(offset) {
+    fetch(`http://localhost:8000/history?limit=${PAGE_SIZE}&offset=${offset}`)
+      .then(r => r.text())
+      .then(body => {
+        // Response is newline-delimited JSON: one action per line
+        const page = body.split('\n').filter(Boolean).map(line => JSON.parse(line));
+        setHistory(prev => (offset === 0 ? page : [...prev, ...page]));
+        setHasMore(page.length === PAGE_SIZE);
+      })
       .catch(console.error);
+  }
+
+  useEffect(() => {
+    loadPage(0);
   }, []);
 
   return (
@@ -45,6 +58,11 @@ export default function History() {
           </tbody>
         </table>
       )}
+      {hasMore && (
+        <button className="history-button" onClick={() => loadPage(history.length)}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -0,0 +1,41 @@
+# Smoke test: CyberbullyModel exports to ONNX and matches eager PyTorch
+
+import pytest
+
+np    = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnx")
+ort = pytest.importorskip("onnxruntime")
+from transformers import BertConfig
+
+from backend.export_onnx import export_model
+from backend.model import CyberbullyModel
+
+def tiny_model():
+    config = BertConfig(
+        vocab_size=100,
+        hidden_size=32,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=64
+    )
+    return CyberbullyModel(config, hidden_size=8).eval()
+
+def test_export_matches_eager(tmp_path):
+    model     = tiny_model()
+    onnx_path = str(tmp_path / "model.onnx")
+    export_model(model, onnx_path)
+
+    # Batch/sequence sizes differ from the export dummy inputs, and rows
+    # have different real lengths (right-padded with PAD id 0)
+    mask = torch.ones(3, 10, dtype=torch.long)
+    mask[1, 6:] = 0
+    mask[2, 3:] = 0
+    ids = torch.randint(1, 100, (3, 10)) * mask
+
+    with torch.no_grad():
+        expected = model(ids, mask).numpy()
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    logits, = session.run(None, {"input_ids": ids.numpy(), "attention_mask": mask.numpy()})
+
+    np.testing.assert_allclose(logits, expected, rtol=1e-4, atol=1e-4)
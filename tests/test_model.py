@@ -0,0 +1,56 @@
+# CyberbullyModel pooling must not depend on how much padding a batch has
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from transformers import BertConfig
+
+from backend.model import CyberbullyModel
+
+def tiny_model(num_layers=1):
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=100,
+        hidden_size=32,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=64
+    )
+    return CyberbullyModel(config, hidden_size=8, num_layers=num_layers).eval()
+
+def pad_to(ids, width):
+    padded = torch.zeros(1, width, dtype=torch.long)
+    padded[0, :ids.size(0)] = ids
+    mask = (padded != 0).long()
+    return padded, mask
+
+@pytest.mark.parametrize("num_layers", [1, 2])
+def test_logits_independent_of_padding(num_layers):
+    model = tiny_model(num_layers)
+    ids   = torch.randint(1, 100, (7,))
+
+    with torch.no_grad():
+        short = model(*pad_to(ids, 10))
+        long  = model(*pad_to(ids, 32))
+
+    torch.testing.assert_close(short, long, rtol=1e-5, atol=1e-5)
+
+def test_unpadded_pooling_matches_packing():
+    model = tiny_model()
+    ids   = torch.randint(1, 100, (3, 12))
+    mask  = torch.ones_like(ids)
+    mask[1, 5:] = 0
+    mask[2, 1:] = 0
+    ids = ids * mask
+
+    with torch.no_grad():
+        seq_out = model.bert(input_ids=ids, attention_mask=mask).last_hidden_state
+        pooled  = model._pool_unpadded(seq_out, mask)
+
+        packed = torch.nn.utils.rnn.pack_padded_sequence(
+            seq_out, mask.sum(dim=1), batch_first=True, enforce_sorted=False
+        )
+        _, (h_n, _) = model.lstm(packed)
+        expected = torch.cat((h_n[-2], h_n[-1]), dim=1)
+
+    torch.testing.assert_close(pooled, expected, rtol=1e-5, atol=1e-5)
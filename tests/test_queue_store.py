@@ -0,0 +1,63 @@
+# Pending-queue stores: in-memory and Redis (via fakeredis)
+
+import asyncio
+
+import pytest
+
+from backend.queue_store import MemoryQueueStore, RedisQueueStore
+
+def make_redis_store(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs it for EVAL/EVALSHA
+    import redis.asyncio
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis.asyncio, "from_url",
+        lambda url, **kwargs: fakeredis.FakeAsyncRedis(server=server, **kwargs)
+    )
+    return RedisQueueStore("redis://fake")
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, monkeypatch):
+    if request.param == "memory":
+        return MemoryQueueStore()
+    return make_redis_store(monkeypatch)
+
+def test_add_items_pop(store):
+    async def run():
+        await store.add("c1", "first", 0.9)
+        await store.add("c2", "second", 0.8)
+        assert await store.items() == [
+            ("c1", {"text": "first", "confidence": 0.9}),
+            ("c2", {"text": "second", "confidence": 0.8})
+        ]
+        assert await store.pop("c1") == {"text": "first", "confidence": 0.9}
+        assert await store.pop("c1") is None
+        assert [cid for cid, _ in await store.items()] == ["c2"]
+
+    asyncio.run(run())
+
+def test_update_confidences_skips_removed(store):
+    async def run():
+        await store.add("c1", "first", 0.9)
+        await store.add("c2", "second", 0.8)
+        # c2 is moderated while re-scoring is running
+        await store.pop("c2")
+        await store.update_confidences(["c1", "c2"], [0.25, 0.75])
+
+        assert await store.items() == [("c1", {"text": "first", "confidence": 0.25})]
+        assert await store.pop("c2") is None
+
+    asyncio.run(run())
+
+def test_redis_update_does_not_recreate_removed_hash(monkeypatch):
+    store = make_redis_store(monkeypatch)
+
+    async def run():
+        await store.add("c1", "first", 0.9)
+        await store.pop("c1")
+        await store.update_confidences(["c1"], [0.5])
+        assert not await store.redis.exists("q:c1")
+
+    asyncio.run(run())